@@ -4,6 +4,7 @@ import importlib
 import io
 import json
 from pathlib import Path
+import re
 import zipfile
 from typing import Dict, Any, Union, List, Tuple
 
@@ -77,27 +78,32 @@ async def _get_pypi_json(pkgname):
     return json.load(fd)
 
 
+# Versions start with a digit, so names containing "-" (e.g. "my-pkg") are
+# still parsed as a whole.
+_WHEEL_RE = re.compile(
+    r"^(?P<name>.+?)-(?P<ver>\d[^-]*)(?:-\d[^-]*)?"
+    r"-(?P<py>[^-]+)-(?P<abi>[^-]+)-(?P<plat>[^-]+)\.whl$"
+)
+
+
 def _parse_wheel_url(url: str) -> Tuple[str, Dict[str, Any], str]:
     """Parse wheels url and extract available metadata
 
     See https://www.python.org/dev/peps/pep-0427/#file-name-convention
     """
-    file_name = Path(url).name
-    # also strip '.whl' extension.
-    wheel_name = Path(url).stem
-    tokens = wheel_name.split("-")
-    # TODO: support optional build tags in the filename (cf PEP 427)
-    if len(tokens) < 5:
+    file_name = url.rpartition("/")[2]
+    match = _WHEEL_RE.match(file_name)
+    if match is None:
         raise ValueError(f"{file_name} is not a valid wheel file name.")
-    version, python_tag, abi_tag, platform = tokens[-4:]
-    name = "-".join(tokens[:-4])
+    name = match["name"]
+    version = match["ver"]
     wheel = {
         "digests": None,  # checksums not available
         "filename": file_name,
         "packagetype": "bdist_wheel",
-        "python_version": python_tag,
-        "abi_tag": abi_tag,
-        "platform": platform,
+        "python_version": match["py"],
+        "abi_tag": match["abi"],
+        "platform": match["plat"],
         "url": url,
     }
 
@@ -4,7 +4,31 @@ from pathlib import Path
 
 import pytest
 
-sys.path.append(str(Path(__file__).resolve().parent / "micropip"))
+_HERE = Path(__file__).resolve().parent
+_REPO_ROOT = _HERE.parents[1]
+
+sys.path.append(str(_HERE / "micropip"))
+
+
+@pytest.fixture(scope="module")
+def micropip_mod():
+    """The micropip module, imported once for all native (non-browser) tests"""
+    pytest.importorskip("distlib")
+    import micropip
+
+    return micropip
+
+
+@pytest.fixture(scope="session")
+def tst_data_symlink():
+    """Expose src/tests/data as build/test_data and yield a relative wheel url"""
+    src = _REPO_ROOT / "src" / "tests" / "data"
+    target = _REPO_ROOT / "build" / "test_data"
+    target.symlink_to(src, True)
+    try:
+        yield "./test_data/snowballstemmer-2.0.0-py2.py3-none-any.whl"
+    finally:
+        target.unlink()
 
 
 def test_install_simple(selenium_standalone):
@@ -28,12 +52,9 @@ def test_install_simple(selenium_standalone):
     )
 
 
-def test_parse_wheel_url():
-    pytest.importorskip("distlib")
-    import micropip
-
+def test_parse_wheel_url(micropip_mod):
     url = "https://a/snowballstemmer-2.0.0-py2.py3-none-any.whl"
-    name, wheel, version = micropip._parse_wheel_url(url)
+    name, wheel, version = micropip_mod._parse_wheel_url(url)
     assert name == "snowballstemmer"
     assert version == "2.0.0"
     assert wheel == {
@@ -49,13 +70,25 @@ def test_parse_wheel_url():
     msg = "not a valid wheel file name"
     with pytest.raises(ValueError, match=msg):
         url = "https://a/snowballstemmer-2.0.0-py2.whl"
-        name, params, version = micropip._parse_wheel_url(url)
+        name, params, version = micropip_mod._parse_wheel_url(url)
 
     url = "http://scikit_learn-0.22.2.post1-cp35-cp35m-macosx_10_9_intel.whl"
-    name, wheel, version = micropip._parse_wheel_url(url)
+    name, wheel, version = micropip_mod._parse_wheel_url(url)
     assert name == "scikit_learn"
     assert wheel["platform"] == "macosx_10_9_intel"
 
+    # the optional build tag is dropped
+    url = "https://a/pkg-1.0-1-py3-none-any.whl"
+    name, wheel, version = micropip_mod._parse_wheel_url(url)
+    assert name == "pkg"
+    assert version == "1.0"
+    assert wheel["python_version"] == "py3"
+
+    url = "https://a/my-pkg-1.0-py3-none-any.whl"
+    name, wheel, version = micropip_mod._parse_wheel_url(url)
+    assert name == "my-pkg"
+    assert version == "1.0"
+
 
 def test_install_custom_url(selenium_standalone, web_server_tst_data):
     server_hostname, server_port, server_log = web_server_tst_data
@@ -72,12 +105,9 @@ def test_install_custom_url(selenium_standalone, web_server_tst_data):
     )
 
 
-def test_add_requirement_relative_url():
-    pytest.importorskip("distlib")
-    import micropip
-
+def test_add_requirement_relative_url(micropip_mod):
     transaction = {"wheels": []}
-    coroutine = micropip.PACKAGE_MANAGER.add_requirement(
+    coroutine = micropip_mod.PACKAGE_MANAGER.add_requirement(
         "./snowballstemmer-2.0.0-py2.py3-none-any.whl", {}, transaction
     )
     # The following is a way to synchronously run a coroutine that does only
@@ -101,30 +131,20 @@ def test_add_requirement_relative_url():
     assert req["url"] == "./snowballstemmer-2.0.0-py2.py3-none-any.whl"
 
 
-def test_install_custom_relative_url(selenium_standalone):
-    root = Path(__file__).resolve().parents[2]
-    src = root / "src" / "tests" / "data"
-    target = root / "build" / "test_data"
-    target.symlink_to(src, True)
-    url = "./test_data/snowballstemmer-2.0.0-py2.py3-none-any.whl"
-    try:
-        selenium_standalone.run_js(
-            f"""
-            await pyodide.runPythonAsync(`
-                import micropip
-                await micropip.install('{url}')
-                import snowballstemmer
-            `)
-            """
-        )
-    finally:
-        target.unlink()
-
+def test_install_custom_relative_url(selenium_standalone, tst_data_symlink):
+    url = tst_data_symlink
+    selenium_standalone.run_js(
+        f"""
+        await pyodide.runPythonAsync(`
+            import micropip
+            await micropip.install('{url}')
+            import snowballstemmer
+        `)
+        """
+    )
 
-def test_last_version_from_pypi():
-    pytest.importorskip("distlib")
-    import micropip
 
+def test_last_version_from_pypi(micropip_mod):
     class Namespace:
         def __init__(self, **entries):
             self.__dict__.update(entries)
@@ -151,6 +171,6 @@ def test_last_version_from_pypi():
     }
 
     # get version number from find_wheel
-    wheel, ver = micropip.PACKAGE_MANAGER.find_wheel(metadata, requirement)
+    wheel, ver = micropip_mod.PACKAGE_MANAGER.find_wheel(metadata, requirement)
 
     assert ver == "0.15.5"
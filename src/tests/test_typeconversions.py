@@ -1,19 +1,33 @@
 # See also test_pyproxy, test_jsproxy, and test_python.
+import base64
+
 import pytest
-from hypothesis import given
+from hypothesis import given, settings
 from hypothesis.strategies import text
 from conftest import selenium_context_manager
 
 
-@given(s=text())
-def test_string_conversion(selenium_module_scope, s):
+@pytest.fixture(scope="module")
+def selenium_ready(selenium_module_scope):
+    """Module scope selenium entered once, for tests driven by hypothesis"""
     with selenium_context_manager(selenium_module_scope) as selenium:
+        yield selenium
+
+
+@given(s=text())
+@settings(max_examples=50, deadline=None)
+def test_string_conversion(selenium_ready, s):
+    selenium = selenium_ready
+    selenium.clean_logs()
+    try:
         # careful string escaping here -- hypothesis will fuzz it.
-        sbytes = list(s.encode())
+        # base64 keeps the injected source compact and free of quotes.
+        sb64 = base64.b64encode(s.encode()).decode()
         selenium.run_js(
             f"""
-            window.sjs = (new TextDecoder("utf8")).decode(new Uint8Array({sbytes}));
-            pyodide.runPython('spy = bytes({sbytes}).decode()');
+            let bytes = Uint8Array.from(atob("{sb64}"), c => c.charCodeAt(0));
+            window.sjs = (new TextDecoder("utf8")).decode(bytes);
+            pyodide.runPython('import base64; spy = base64.b64decode("{sb64}").decode()');
             """
         )
         assert selenium.run_js(f"""return pyodide.runPython('spy') === sjs;""")
@@ -23,53 +37,55 @@ def test_string_conversion(selenium_module_scope, s):
             sjs == spy
             """
         )
+    finally:
+        print(selenium.logs)
 
 
 def test_python2js(selenium):
-    assert selenium.run_js('return pyodide.runPython("None") === undefined')
-    assert selenium.run_js('return pyodide.runPython("True") === true')
-    assert selenium.run_js('return pyodide.runPython("False") === false')
-    assert selenium.run_js('return pyodide.runPython("42") === 42')
-    assert selenium.run_js('return pyodide.runPython("3.14") === 3.14')
-    # Need to test all three internal string representations in Python: UCS1,
-    # UCS2 and UCS4
-    assert selenium.run_js('return pyodide.runPython("\'ascii\'") === "ascii"')
-    assert selenium.run_js('return pyodide.runPython("\'ιωδιούχο\'") === "ιωδιούχο"')
-    assert selenium.run_js('return pyodide.runPython("\'碘化物\'") === "碘化物"')
-    assert selenium.run_js('return pyodide.runPython("\'🐍\'") === "🐍"')
-    # TODO: replace with suitable test for the behavior of bytes objects once we
-    # get the new behavior specified.
-    # assert selenium.run_js(
-    #     "let x = pyodide.runPython(\"b'bytes'\");\n"
-    #     "return (x instanceof window.Uint8ClampedArray) && "
-    #     "(x.length === 5) && "
-    #     "(x[0] === 98)"
-    # )
-    assert selenium.run_js(
-        """
-        let proxy = pyodide.runPython("[1, 2, 3]");
-        let typename = proxy.type;
-        let x = proxy.toJs();
-        proxy.destroy();
-        return ((typename === "list") && (x instanceof window.Array) && 
-                (x.length === 3) && (x[0] == 1) && (x[1] == 2) && (x[2] == 3));
-        """
-    )
-    assert selenium.run_js(
-        """
-        let proxy = pyodide.runPython("{42: 64}");
-        let typename = proxy.type;
-        let x = proxy.toJs();
-        proxy.destroy();
-        return (typename === "dict") && (x.constructor.name === "Map") && (x.get(42) === 64)
-        """
-    )
-    assert selenium.run_js(
-        """
-        let x = pyodide.runPython("open('/foo.txt', 'wb')")
-        return (x.tell() === 0)
+    result = selenium.run_js(
         """
-    )
+        let list_proxy = pyodide.runPython("[1, 2, 3]");
+        let list_typename = list_proxy.type;
+        let list = list_proxy.toJs();
+        list_proxy.destroy();
+
+        let dict_proxy = pyodide.runPython("{42: 64}");
+        let dict_typename = dict_proxy.type;
+        let dict = dict_proxy.toJs();
+        dict_proxy.destroy();
+
+        let file = pyodide.runPython("open('/foo.txt', 'wb')");
+
+        return [
+            pyodide.runPython("None") === undefined,
+            pyodide.runPython("True") === true,
+            pyodide.runPython("False") === false,
+            pyodide.runPython("42") === 42,
+            pyodide.runPython("3.14") === 3.14,
+            // Need to test all three internal string representations in
+            // Python: UCS1, UCS2 and UCS4
+            pyodide.runPython("'ascii'") === "ascii",
+            pyodide.runPython("'ιωδιούχο'") === "ιωδιούχο",
+            pyodide.runPython("'碘化物'") === "碘化物",
+            pyodide.runPython("'🐍'") === "🐍",
+            // TODO: replace with suitable test for the behavior of bytes
+            // objects once we get the new behavior specified.
+            // (() => {
+            //     let x = pyodide.runPython("b'bytes'");
+            //     return (x instanceof window.Uint8ClampedArray) &&
+            //         (x.length === 5) &&
+            //         (x[0] === 98);
+            // })(),
+            (list_typename === "list") && (list instanceof window.Array) &&
+                (list.length === 3) && (list[0] == 1) && (list[1] == 2) &&
+                (list[2] == 3),
+            (dict_typename === "dict") && (dict.constructor.name === "Map") &&
+                (dict.get(42) === 64),
+            file.tell() === 0,
+        ];
+        """
+    )
+    assert result == [True] * 12
 
 
 def test_python2js_long_ints(selenium):
@@ -113,59 +129,37 @@ def test_js2python(selenium):
         window.jsobject = new XMLHttpRequest();
         """
     )
-    assert selenium.run("from js import jsstring_ucs1\n" 'jsstring_ucs1 == "pyodidé"')
-    assert selenium.run("from js import jsstring_ucs2\n" 'jsstring_ucs2 == "碘化物"')
-    assert selenium.run("from js import jsstring_ucs4\n" 'jsstring_ucs4 == "🐍"')
-    assert selenium.run(
-        "from js import jsnumber0\n" "jsnumber0 == 42 and isinstance(jsnumber0, int)"
-    )
-    assert selenium.run(
-        "from js import jsnumber1\n"
-        "jsnumber1 == 42.5 and isinstance(jsnumber1, float)"
-    )
-    assert selenium.run("from js import jsundefined\n" "jsundefined is None")
-    assert selenium.run("from js import jstrue\n" "jstrue is True")
-    assert selenium.run("from js import jsfalse\n" "jsfalse is False")
-    assert selenium.run("from js import jspython\n" "jspython is open")
-    assert selenium.run(
-        """
-        from js import jsbytes
-        ((jsbytes.tolist() == [1, 2, 3])
-         and (jsbytes.tobytes() == b"\x01\x02\x03"))
-        """
-    )
-    assert selenium.run(
+    result = selenium.run(
         """
-        from js import jsfloats
+        from js import (
+            jsstring_ucs1, jsstring_ucs2, jsstring_ucs4, jsnumber0, jsnumber1,
+            jsundefined, jstrue, jsfalse, jspython, jsbytes, jsfloats,
+            jsobject, jsarray0, jsarray1,
+        )
         import struct
-        expected = struct.pack("fff", 1, 2, 3)
-        (jsfloats.tolist() == [1, 2, 3]) and (jsfloats.tobytes() == expected)
-        """
-    )
-    assert selenium.run(
-        """
-        from js import jsobject
-        str(jsobject) == "[object XMLHttpRequest]"
-        """
-    )
-    assert selenium.run(
-        """
-        from js import jsobject
-        bool(jsobject) == True
-        """
-    )
-    assert selenium.run(
-        """
-        from js import jsarray0
-        bool(jsarray0) == False
-        """
-    )
-    assert selenium.run(
-        """
-        from js import jsarray1
-        bool(jsarray1) == True
-        """
-    )
+        expected_floats = struct.pack("fff", 1, 2, 3)
+        [
+            jsstring_ucs1 == "pyodidé",
+            jsstring_ucs2 == "碘化物",
+            jsstring_ucs4 == "🐍",
+            jsnumber0 == 42 and isinstance(jsnumber0, int),
+            jsnumber1 == 42.5 and isinstance(jsnumber1, float),
+            jsundefined is None,
+            jstrue is True,
+            jsfalse is False,
+            jspython is open,
+            ((jsbytes.tolist() == [1, 2, 3])
+             and (jsbytes.tobytes() == b"\x01\x02\x03")),
+            ((jsfloats.tolist() == [1, 2, 3])
+             and (jsfloats.tobytes() == expected_floats)),
+            str(jsobject) == "[object XMLHttpRequest]",
+            bool(jsobject) == True,
+            bool(jsarray0) == False,
+            bool(jsarray1) == True,
+        ]
+        """
+    )
+    assert result == [True] * 15
 
 
 def test_js2python_bool(selenium):
@@ -189,49 +183,54 @@ def test_js2python_bool(selenium):
     )
 
 
-@pytest.mark.parametrize("wasm_heap", (False, True))
-@pytest.mark.parametrize(
-    "jstype, pytype",
-    (
-        ("Int8Array", "b"),
-        ("Uint8Array", "B"),
-        ("Uint8ClampedArray", "B"),
-        ("Int16Array", "h"),
-        ("Uint16Array", "H"),
-        ("Int32Array", "i"),
-        ("Uint32Array", "I"),
-        ("Float32Array", "f"),
-        ("Float64Array", "d"),
-    ),
-)
-def test_typed_arrays(selenium, wasm_heap, jstype, pytype):
-    if not wasm_heap:
-        selenium.run_js(f"window.array = new {jstype}([1, 2, 3, 4]);\n")
-    else:
-        selenium.run_js(
-            f"""
-             let buffer = pyodide._module._malloc(
-                   4 * {jstype}.BYTES_PER_ELEMENT);
-             window.array = new {jstype}(
-                   pyodide._module.HEAPU8.buffer, buffer, 4);
-             window.array[0] = 1;
-             window.array[1] = 2;
-             window.array[2] = 3;
-             window.array[3] = 4;
-             """
-        )
-    assert selenium.run(
-        f"""
-         from js import array
-         import struct
-         expected = struct.pack("{pytype*4}", 1, 2, 3, 4)
-         print(array.format, array.tolist(), array.tobytes())
-         ((array.format == "{pytype}")
-          and array.tolist() == [1, 2, 3, 4]
-          and array.tobytes() == expected
-          and array.obj._has_bytes() is {not wasm_heap})
-         """
+def test_typed_arrays(selenium):
+    failed = selenium.run_js(
+        """
+        let cases = [
+            ["Int8Array", "b"],
+            ["Uint8Array", "B"],
+            ["Uint8ClampedArray", "B"],
+            ["Int16Array", "h"],
+            ["Uint16Array", "H"],
+            ["Int32Array", "i"],
+            ["Uint32Array", "I"],
+            ["Float32Array", "f"],
+            ["Float64Array", "d"],
+        ];
+        let failed = [];
+        for(let wasm_heap of [false, true]){
+            for(let [jstype, pytype] of cases){
+                let cls = window[jstype];
+                if(!wasm_heap){
+                    window.array = new cls([1, 2, 3, 4]);
+                } else {
+                    let buffer = pyodide._module._malloc(
+                        4 * cls.BYTES_PER_ELEMENT);
+                    window.array = new cls(
+                        pyodide._module.HEAPU8.buffer, buffer, 4);
+                    window.array[0] = 1;
+                    window.array[1] = 2;
+                    window.array[2] = 3;
+                    window.array[3] = 4;
+                }
+                let ok = pyodide.runPython(`
+                    from js import array
+                    import struct
+                    expected = struct.pack("${pytype.repeat(4)}", 1, 2, 3, 4)
+                    ((array.format == "${pytype}")
+                     and array.tolist() == [1, 2, 3, 4]
+                     and array.tobytes() == expected
+                     and array.obj._has_bytes() is ${wasm_heap ? "False" : "True"})
+                `);
+                if(ok !== true){
+                    failed.push([jstype, wasm_heap]);
+                }
+            }
+        }
+        return failed;
+        """
     )
+    assert failed == []
 
 
 def test_array_buffer(selenium):
@@ -247,22 +246,6 @@ def test_array_buffer(selenium):
     )
 
 
-def assert_js_to_py_to_js(selenium, name):
-    selenium.run_js(f"window.obj = {name};")
-    selenium.run("from js import obj")
-    assert selenium.run_js("return pyodide.globals.get('obj') === obj;")
-
-
-def assert_py_to_js_to_py(selenium, name):
-    selenium.run_js(f"window.obj = pyodide.globals.get('{name}');")
-    assert selenium.run(
-        f"""
-        from js import obj
-        obj is {name}
-        """
-    )
-
-
 def test_recursive_list_to_js(selenium_standalone):
     selenium_standalone.run(
         """
@@ -283,34 +266,30 @@ def test_recursive_dict_to_js(selenium_standalone):
     selenium_standalone.run_js("x = pyodide.pyimport('x').toJs();")
 
 
-def test_list_js2py2js(selenium):
-    selenium.run_js("window.x = [1,2,3];")
-    assert_js_to_py_to_js(selenium, "x")
-
-
-def test_dict_js2py2js(selenium):
-    selenium.run_js("window.x = { a : 1, b : 2, 0 : 3 };")
-    assert_js_to_py_to_js(selenium, "x")
-
-
-def test_error_js2py2js(selenium):
-    selenium.run_js("window.err = new Error('hello there?');")
-    assert_js_to_py_to_js(selenium, "err")
-
-
-def test_error_py2js2py(selenium):
-    selenium.run("err = Exception('hello there?');")
-    assert_py_to_js_to_py(selenium, "err")
-
-
-def test_list_py2js2py(selenium):
-    selenium.run("x = ['a', 'b']")
-    assert_py_to_js_to_py(selenium, "x")
-
-
-def test_dict_py2js2py(selenium):
-    selenium.run("x = {'a' : 5, 'b' : 1}")
-    assert_py_to_js_to_py(selenium, "x")
+def test_js2py2js_py2js2py(selenium):
+    result = selenium.run_js(
+        """
+        function js2py2js(value){
+            window.obj = value;
+            pyodide.runPython("from js import obj");
+            return pyodide.globals.get("obj") === obj;
+        }
+        function py2js2py(setup, name){
+            pyodide.runPython(setup);
+            window.obj = pyodide.globals.get(name);
+            return pyodide.runPython(`from js import obj\nobj is ${name}`);
+        }
+        return [
+            js2py2js([1,2,3]),
+            js2py2js({ a : 1, b : 2, 0 : 3 }),
+            js2py2js(new Error('hello there?')),
+            py2js2py("err = Exception('hello there?')", "err"),
+            py2js2py("x = ['a', 'b']", "x"),
+            py2js2py("x = {'a' : 5, 'b' : 1}", "x"),
+        ];
+        """
+    )
+    assert result == [True] * 6
 
 
 def test_jsproxy_attribute_error(selenium):
@@ -404,113 +383,104 @@ def test_memoryview_conversion(selenium):
     )
 
 
-def test_python2js_with_depth(selenium):
-    assert selenium.run_js(
-        """
-        pyodide.runPython("a = [1, 2, 3]");
-        let res = pyodide.pyimport("a").toJs();
-        return (Array.isArray(res)) && JSON.stringify(res) === "[1,2,3]";
-        """
-    )
-
-    assert selenium.run_js(
-        """
-        pyodide.runPython("a = (1, 2, 3)");
-        let res = pyodide.pyimport("a").toJs();
-        return (Array.isArray(res)) && JSON.stringify(res) === "[1,2,3]";
-        """
-    )
-
-    assert selenium.run_js(
-        """
-        pyodide.runPython("a = [(1,2), (3,4), [5, 6], { 2 : 3,  4 : 9}]")
-        let res = pyodide.pyimport("a").toJs();
-        return Array.isArray(res) && \
-            JSON.stringify(res) === `[[1,2],[3,4],[5,6],{}]` && \
-            JSON.stringify(Array.from(res[3].entries())) === "[[2,3],[4,9]]";
-        """
-    )
-
-    selenium.run_js(
+@pytest.fixture(scope="module")
+def js_test_helpers(selenium_module_scope):
+    """Define the window.assert and window.__depthProbe JS helpers"""
+    selenium_module_scope.run_js(
         """
         window.assert = function assert(x, msg){
             if(x !== true){
                 throw new Error(`Assertion failed: ${msg}`);
             }
         }
-        """
-    )
 
-    selenium.run_js(
-        """
-        pyodide.runPython("a = [1,[2,[3,[4,[5,[6,[7]]]]]]]")
-        let a = pyodide.pyimport("a");
-        for(let i=0; i < 7; i++){
-            let x = a.toJs(i);
-            for(let j=0; j < i; j++){
-                assert(Array.isArray(x), `i: ${i}, j: ${j}`);
-                x = x[1];
+        window.__depthProbe = function(name){
+            let a = pyodide.pyimport(name);
+            for(let i=0; i < 7; i++){
+                let x = a.toJs(i);
+                for(let j=0; j < i; j++){
+                    assert(Array.isArray(x), `i: ${i}, j: ${j}`);
+                    x = x[1];
+                }
+                assert(pyodide._module.PyProxy.isPyProxy(x), `i: ${i}, j: ${i}`);
             }
-            assert(pyodide._module.PyProxy.isPyProxy(x), `i: ${i}, j: ${i}`);
         }
         """
     )
 
+
+def test_python2js_with_depth(selenium, js_test_helpers):
     selenium.run_js(
         """
-        pyodide.runPython("a = [1, (2, (3, [4, (5, (6, [7]))]))]")
-        function assert(x, msg){
-            if(x !== true){
-                throw new Error(`Assertion failed: ${msg}`);
-            }
+        {
+            pyodide.runPython("a = [1, 2, 3]");
+            let res = pyodide.pyimport("a").toJs();
+            assert(Array.isArray(res), "list");
+            assert(JSON.stringify(res) === "[1,2,3]", "list");
         }
-        let a = pyodide.pyimport("a");
-        for(let i=0; i < 7; i++){
-            let x = a.toJs(i);
-            for(let j=0; j < i; j++){
-                assert(Array.isArray(x), `i: ${i}, j: ${j}`);
-                x = x[1];
-            }
-            assert(pyodide._module.PyProxy.isPyProxy(x), `i: ${i}, j: ${i}`);
+
+        {
+            pyodide.runPython("a = (1, 2, 3)");
+            let res = pyodide.pyimport("a").toJs();
+            assert(Array.isArray(res), "tuple");
+            assert(JSON.stringify(res) === "[1,2,3]", "tuple");
         }
-        """
-    )
 
-    selenium.run_js(
-        """
-        pyodide.runPython(`
-            a = [1, 2, 3, 4, 5]
-            b = [a, a, a, a, a]
-            c = [b, b, b, b, b]
-        `);
-        let total_refs = pyodide._module.hiwire.num_keys();
-        let res = pyodide.pyimport("c").toJs();
-        let new_total_refs = pyodide._module.hiwire.num_keys();
-        assert(total_refs === new_total_refs);
-        assert(res[0] === res[1]);
-        assert(res[0][0] === res[1][1]);
-        assert(res[4][0] === res[1][4]);
-        """
-    )
+        {
+            pyodide.runPython("a = [(1,2), (3,4), [5, 6], { 2 : 3,  4 : 9}]")
+            let res = pyodide.pyimport("a").toJs();
+            assert(Array.isArray(res), "mixed");
+            assert(JSON.stringify(res) === `[[1,2],[3,4],[5,6],{}]`, "mixed");
+            assert(
+                JSON.stringify(Array.from(res[3].entries())) === "[[2,3],[4,9]]",
+                "mixed"
+            );
+        }
 
-    selenium.run_js(
-        """
-        pyodide.runPython(`
-            a = [["b"]]
-            b = [1,2,3, a[0]]
-            a[0].append(b)
-            a.append(b)
-        `);
-        let total_refs = pyodide._module.hiwire.num_keys();
-        let res = pyodide.pyimport("a").toJs();
-        let new_total_refs = pyodide._module.hiwire.num_keys();
-        assert(total_refs === new_total_refs);
-        assert(res[0][0] === "b");
-        assert(res[1][2] === 3);
-        assert(res[1][3] === res[0]);
-        assert(res[0][1] === res[1]);
+        {
+            pyodide.runPython("a = [1,[2,[3,[4,[5,[6,[7]]]]]]]")
+            __depthProbe("a");
+        }
+
+        {
+            pyodide.runPython("a = [1, (2, (3, [4, (5, (6, [7]))]))]")
+            __depthProbe("a");
+        }
+
+        {
+            pyodide.runPython(`
+                a = [1, 2, 3, 4, 5]
+                b = [a, a, a, a, a]
+                c = [b, b, b, b, b]
+            `);
+            let total_refs = pyodide._module.hiwire.num_keys();
+            let res = pyodide.pyimport("c").toJs();
+            let new_total_refs = pyodide._module.hiwire.num_keys();
+            assert(total_refs === new_total_refs);
+            assert(res[0] === res[1]);
+            assert(res[0][0] === res[1][1]);
+            assert(res[4][0] === res[1][4]);
+        }
+
+        {
+            pyodide.runPython(`
+                a = [["b"]]
+                b = [1,2,3, a[0]]
+                a[0].append(b)
+                a.append(b)
+            `);
+            let total_refs = pyodide._module.hiwire.num_keys();
+            let res = pyodide.pyimport("a").toJs();
+            let new_total_refs = pyodide._module.hiwire.num_keys();
+            assert(total_refs === new_total_refs);
+            assert(res[0][0] === "b");
+            assert(res[1][2] === 3);
+            assert(res[1][3] === res[0]);
+            assert(res[0][1] === res[1]);
+        }
         """
     )
+
     msg = "pyodide.ConversionError"
     with pytest.raises(selenium.JavascriptException, match=msg):
         selenium.run_js(
@@ -562,13 +532,12 @@ def test_to_py(selenium):
         """
         window.a = new Map([[1, [1,2,new Set([1,2,3])]], [2, new Map([[1,2],[2,7]])]]);
         a.get(2).set("a", a);
-        let result = [];
-        for(let i = 0; i < 4; i++){
-            result.push(pyodide.runPython(`
-                from js import a
-                repr(a.to_py(${i}))
-            `));
-        }
+        let proxy = pyodide.runPython(`
+            from js import a
+            [repr(a.to_py(i)) for i in range(4)]
+        `);
+        let result = proxy.toJs();
+        proxy.destroy();
         return result;
         """
     )
@@ -583,13 +552,12 @@ def test_to_py(selenium):
         """
         window.a = { "x" : 2, "y" : 7, "z" : [1,2] };
         a.z.push(a);
-        let result = [];
-        for(let i = 0; i < 4; i++){
-            result.push(pyodide.runPython(`
-                from js import a
-                repr(a.to_py(${i}))
-            `));
-        }
+        let proxy = pyodide.runPython(`
+            from js import a
+            [repr(a.to_py(i)) for i in range(4)]
+        `);
+        let result = proxy.toJs();
+        proxy.destroy();
         return result;
         """
     )